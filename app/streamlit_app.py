@@ -1,9 +1,14 @@
 # app/streamlit_app.py
 import os
 import json
+import time
+import hashlib
+import threading
+from collections import Counter
 import pandas as pd
 import streamlit as st
 from neo4j import GraphDatabase
+from neo4j.exceptions import ClientError
 from openai import OpenAI
 import re
 from datetime import datetime
@@ -19,25 +24,160 @@ NEO4J_DATABASE = os.getenv("NEO4J_DATABASE", "neo4j")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 
+# ---- Intent patterns ----
+# Keyword lists per chat intent, checked in this order by the router
+INTENT_KEYWORDS = {
+    "employee": ['malavika', 'omkar', 'john', 'alice', 'about', 'tell me about', 'details of'],
+    "skill": ['python', 'java', 'skill', 'react', 'knows', 'knowledge'],
+    "project": ['project', 'working on', 'team'],
+    "list": ['all', 'list', 'show', 'employees'],
+}
+# One alternation per intent (substring match, same as `word in prompt`)
+_INTENT_RES = {
+    intent: re.compile("|".join(re.escape(w) for w in words))
+    for intent, words in INTENT_KEYWORDS.items()
+}
+_NAME_RE = re.compile(r'(?:about|tell me about|show|find|details of)\s+([a-zA-Z\s]+)')
+_SKILL_RE = re.compile(r'(?:knows?|with|has|skill[s]?)\s+([a-zA-Z\s]+)')
+_LIST_RE = re.compile(r'\b(all|list|show)\b')
+_TERM_RE = re.compile(r'[0-9a-z]+')
+# Filler words that would otherwise become OR'd prefix terms matching unrelated names
+_SEARCH_STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'who', 'what', 'which', 'me', 'of', 'in',
+    'on', 'for', 'with', 'and', 'or', 'to', 'show', 'find', 'list', 'all', 'any',
+}
+
+def detect_intents(prompt_lower: str) -> set[str]:
+    """Return every intent whose keywords appear in the (lower-cased) prompt."""
+    return {intent for intent, rx in _INTENT_RES.items() if rx.search(prompt_lower)}
+
+def fulltext_terms(text: str) -> str:
+    """Turn free text into a Lucene prefix query for db.index.fulltext.queryNodes ("" if no terms)."""
+    terms = [t for t in _TERM_RE.findall(text.lower()) if t not in _SEARCH_STOPWORDS]
+    return " ".join(f"{term}*" for term in terms)
+
 # ---- Clients ----
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD)) if NEO4J_URI and NEO4J_PASSWORD else None
+@st.cache_resource
+def get_driver():
+    """One pooled Neo4j driver per server process, shared across reruns and sessions."""
+    if not (NEO4J_URI and NEO4J_PASSWORD):
+        return None
+    return GraphDatabase.driver(
+        NEO4J_URI,
+        auth=(NEO4J_USER, NEO4J_PASSWORD),
+        max_connection_pool_size=20,
+        connection_acquisition_timeout=10,
+    )
+
 client = OpenAI(api_key=OPENAI_API_KEY) if OPENAI_API_KEY else None
 
-def run_cypher(query: str, params: dict | None = None):
+def run_cyphers(pairs: list[tuple[str, dict | None]]) -> list[list[dict]]:
+    """Run several statements in one session; returns one result list per statement."""
+    driver = get_driver()
     if driver is None:
         raise RuntimeError("Neo4j driver is not configured. Set NEO4J_URI/NEO4J_PASSWORD.")
     with driver.session(database=NEO4J_DATABASE) as s:
-        return s.run(query, **(params or {})).data()
+        return [s.run(query, **(params or {})).data() for query, params in pairs]
+
+def run_cypher(query: str, params: dict | None = None):
+    return run_cyphers([(query, params)])[0]
+
+# Raised by db.index.fulltext.queryNodes when the index does not exist
+FULLTEXT_UNAVAILABLE_CODE = "Neo.ClientError.Procedure.ProcedureCallFailed"
+
+def run_fulltext(fulltext_query: str, contains_query: str, param: str, text: str):
+    """
+    Run a db.index.fulltext.queryNodes search for `text`, falling back to the
+    CONTAINS scan when there are no usable terms or the index does not exist
+    (database not re-ingested since the full-text indexes were added).
+    """
+    terms = fulltext_terms(text)
+    if terms:
+        try:
+            return run_cypher(fulltext_query, {param: terms})
+        except ClientError as e:
+            # Only a failing procedure (e.g. missing index) falls back; syntax/auth errors surface
+            if e.code != FULLTEXT_UNAVAILABLE_CODE:
+                raise
+    return run_cypher(contains_query, {param: text})
+
+# Placeholder shown in result tables for missing values
+NOT_SPECIFIED = "Not specified"
+
+# ---- LLM summary cache ----
+SUMMARY_CACHE_TTL = 1800  # seconds
 
-def generate_ai_summary(question: str, data: list, query_type: str) -> str:
-    """Generate a conversational AI summary based on REAL data."""
-    if not client or not data:
-        return generate_accurate_summary(data, question, query_type)
+@st.cache_resource
+def _summary_store() -> dict[str, tuple[str, float]]:
+    """Process-wide summary cache; survives reruns like get_driver()."""
+    return {}
+
+@st.cache_resource
+def _summary_lock() -> threading.Lock:
+    """Guards _summary_store(), which every session thread reads and writes."""
+    return threading.Lock()
+
+def _summary_get(key: str) -> str | None:
+    """Return a fresh cached summary, dropping expired entries so the store stays bounded."""
+    store = _summary_store()
+    now = time.time()
+    with _summary_lock():
+        for k in [k for k, (_, ts) in store.items() if now - ts >= SUMMARY_CACHE_TTL]:
+            del store[k]
+        hit = store.get(key)
+    return hit[0] if hit else None
+
+def _summary_put(key: str, summary: str) -> None:
+    with _summary_lock():
+        _summary_store()[key] = (summary, time.time())
+    # Remember which entries this session produced so "Clear Cache" stays session-scoped
+    st.session_state.summary_keys.add(key)
+
+def _summary_clear_session() -> None:
+    """Drop the summaries cached by the current session only."""
+    with _summary_lock():
+        for key in st.session_state.summary_keys:
+            _summary_store().pop(key, None)
+    st.session_state.summary_keys = set()
+
+def _summary_cache_key(question: str, data: list, query_type: str) -> str:
+    payload = json.dumps({"m": OPENAI_MODEL, "q": question, "t": query_type, "d": data},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+# Listing views where the table already says it all
+LIST_QUERY_TYPES = {"employees", "projects"}
+LLM_MAX_LIST_ROWS = 20
+
+def _should_call_llm(query_type: str, data: list, prompt: str) -> bool:
+    """Skip the model for plain "show/list all" answers and large listings."""
+    if query_type not in LIST_QUERY_TYPES:
+        return True
+    return len(data) <= LLM_MAX_LIST_ROWS and not _LIST_RE.search(prompt.lower())
+
+def generate_ai_summary(question: str, data: list, query_type: str, cache: bool = True,
+                        placeholder=None, df: pd.DataFrame | None = None) -> str:
+    """Generate a conversational AI summary based on REAL data.
+
+    With cache=True the model is called at temperature 0 and the answer is
+    memoized for SUMMARY_CACHE_TTL seconds; cache=False keeps the more varied 0.3.
+    If a Streamlit placeholder is given, the answer is streamed into it.
+    `df` is the already-built table for `data`, reused by the non-AI fallback.
+    """
+    if not client or not data or not _should_call_llm(query_type, data, question):
+        return generate_accurate_summary(data, question, query_type, df=df)
+    
+    key = None
+    if cache:
+        try:
+            key = _summary_cache_key(question, data, query_type)
+            hit = _summary_get(key)
+            if hit is not None:
+                return hit
+        except Exception:
+            key = None  # cache trouble: just answer without it
     
     try:
-        # Create a factual context from the actual data
-        df = pd.DataFrame(data)
-        
         # Build factual context string
         context_parts = [f"User asked: '{question}'"]
         context_parts.append(f"Found {len(data)} record(s) in the database:")
@@ -56,16 +196,16 @@ def generate_ai_summary(question: str, data: list, query_type: str) -> str:
                 context_parts.append(f"Manager: {employee['manager']}")
                 
         elif query_type == "skills" and len(data) > 0:
-            skills_summary = df.groupby('skill')['employee'].count().to_dict()
+            skills_summary = dict(Counter(d['skill'] for d in data))
             context_parts.append(f"Skills distribution: {skills_summary}")
-            context_parts.append(f"Sample employees with these skills: {', '.join(df['employee'].head(5).tolist())}")
+            context_parts.append(f"Sample employees with these skills: {', '.join(d['employee'] for d in data[:5])}")
             
         elif query_type == "projects" and len(data) > 0:
-            projects_summary = df.groupby('project')['employee'].count().to_dict()
+            projects_summary = dict(Counter(d['project'] for d in data))
             context_parts.append(f"Projects distribution: {projects_summary}")
             
         elif query_type == "employees" and len(data) > 0:
-            roles_summary = df['designation'].value_counts().head(5).to_dict()
+            roles_summary = dict(Counter(d['designation'] for d in data if d['designation'] is not None).most_common(5))
             context_parts.append(f"Top roles: {roles_summary}")
             context_parts.append(f"Total employees found: {len(data)}")
         
@@ -85,27 +225,41 @@ def generate_ai_summary(question: str, data: list, query_type: str) -> str:
         Be conversational but strictly factual.
         """
         
-        response = client.chat.completions.create(
+        stream = client.chat.completions.create(
             model=OPENAI_MODEL,
             messages=[
                 {"role": "system", "content": "You are a precise HR assistant that only uses provided data. Never invent information."},
                 {"role": "user", "content": prompt}
             ],
-            temperature=0.3,
-            max_tokens=300
+            temperature=0 if cache else 0.3,
+            max_tokens=300,
+            stream=True
         )
         
-        return response.choices[0].message.content.strip()
+        # Render tokens as they arrive so the user sees the first words right away
+        summary = ""
+        for chunk in stream:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                summary += delta
+                if placeholder is not None:
+                    placeholder.markdown(summary + "▌")
+        summary = summary.strip()
+        if key is not None:
+            _summary_put(key, summary)
+        return summary
         
     except Exception as e:
-        return generate_accurate_summary(data, question, query_type)
+        return generate_accurate_summary(data, question, query_type, df=df)
 
-def generate_accurate_summary(data: list, question: str, query_type: str) -> str:
+def generate_accurate_summary(data: list, question: str, query_type: str,
+                              df: pd.DataFrame | None = None) -> str:
     """Generate a 100% accurate summary without AI."""
     if not data:
         return "❌ No matching records found in the database for your query."
     
-    df = pd.DataFrame(data)
+    if df is None:
+        df = pd.DataFrame(data)
     
     summary_parts = [f"✅ Found {len(data)} matching record(s) in the database:"]
     
@@ -134,67 +288,66 @@ def generate_accurate_summary(data: list, question: str, query_type: str) -> str
         summary_parts.append(f"**Employees on these projects:** {len(df['employee'].unique())}")
         
     elif query_type == "employees":
-        unique_roles = df['designation'].value_counts().head(5)
+        # A display-cleaned df marks missing roles with NOT_SPECIFIED; don't count those
+        roles = df['designation']
+        unique_roles = roles[roles != NOT_SPECIFIED].value_counts().head(5)
         roles_text = ', '.join([f"{role} ({count})" for role, count in unique_roles.items()])
         summary_parts.append(f"**Role distribution:** {roles_text}")
     
     return "\n\n".join(summary_parts)
 
+# ---- Chat query cache (per session) ----
+QUERY_CACHE_TTL = 60  # seconds
+
+def cached_query(query_type: str, prompt: str, fetch):
+    """Return fetch() for this question, reusing a result from the last QUERY_CACHE_TTL seconds."""
+    cache = st.session_state.query_cache
+    key = hashlib.md5(f"{query_type}|{prompt.lower().strip()}".encode()).hexdigest()
+    now = time.time()
+    hit = cache.get(key)
+    if hit and now - hit[1] < QUERY_CACHE_TTL:
+        return hit[0]
+    data = fetch()
+    # Prune on insert so the session's cache only holds live entries
+    for k in [k for k, (_, ts) in cache.items() if now - ts >= QUERY_CACHE_TTL]:
+        del cache[k]
+    if data is not None:
+        cache[key] = (data, time.time())
+    return data
+
 def get_comprehensive_employee_data(name: str) -> dict:
     """Get ALL available data for a specific employee from Neo4j."""
-    # Main employee query
+    # Basic info, skills, projects and manager in a single round trip.
+    # (One query beats four concurrent ones: same latency floor, one session,
+    # and no async driver/event loop to manage inside Streamlit reruns.)
     employee_query = """
-    MATCH (e:Employee) 
-    WHERE toLower(e.name) CONTAINS toLower($name)
-    RETURN e.empId AS employee_id, e.name AS name, e.designation AS designation, 
-           e.doj AS date_of_joining, e.gender AS gender
-    LIMIT 1
-    """
-    
-    # Skills query
-    skills_query = """
-    MATCH (e:Employee)-[hs:HAS_SKILL]->(s:Skill)
+    MATCH (e:Employee)
     WHERE toLower(e.name) CONTAINS toLower($name)
-    RETURN collect(DISTINCT s.name) AS skills
-    """
-    
-    # Projects query
-    projects_query = """
-    MATCH (e:Employee)-[w:WORKS_ON]->(p:Project)
-    WHERE toLower(e.name) CONTAINS toLower($name)
-    RETURN collect(DISTINCT p.name) AS projects
-    """
-    
-    # Manager query
-    manager_query = """
-    MATCH (e:Employee)-[:REPORTS_TO]->(m:Employee)
-    WHERE toLower(e.name) CONTAINS toLower($name)
-    RETURN m.name AS manager
-    LIMIT 1
+    WITH e LIMIT 1
+    OPTIONAL MATCH (e)-[:HAS_SKILL]->(s:Skill)
+    WITH e, collect(DISTINCT s.name) AS skills
+    OPTIONAL MATCH (e)-[:WORKS_ON]->(p:Project)
+    WITH e, skills, collect(DISTINCT p.name) AS projects
+    OPTIONAL MATCH (e)-[:REPORTS_TO]->(m:Employee)
+    RETURN e.empId AS employee_id, e.name AS name, e.designation AS designation,
+           e.doj AS date_of_joining, e.gender AS gender,
+           skills, projects, head(collect(m.name)) AS manager
     """
     
     try:
-        # Execute all queries
-        basic_info = run_cypher(employee_query, {"name": name})
-        if not basic_info:
+        result = run_cypher(employee_query, {"name": name})
+        if not result:
             return None
             
-        employee_data = basic_info[0]
+        employee_data = result[0]
         
-        # Get skills
-        skills_result = run_cypher(skills_query, {"name": name})
-        if skills_result and skills_result[0]['skills']:
-            employee_data['skills'] = skills_result[0]['skills']
-        
-        # Get projects
-        projects_result = run_cypher(projects_query, {"name": name})
-        if projects_result and projects_result[0]['projects']:
-            employee_data['projects'] = projects_result[0]['projects']
-        
-        # Get manager
-        manager_result = run_cypher(manager_query, {"name": name})
-        if manager_result:
-            employee_data['manager'] = manager_result[0]['manager']
+        # Keep the same shape as before: only include related data that exists
+        if not employee_data['skills']:
+            del employee_data['skills']
+        if not employee_data['projects']:
+            del employee_data['projects']
+        if employee_data['manager'] is None:
+            del employee_data['manager']
         
         return employee_data
         
@@ -209,12 +362,16 @@ st.caption("Ask me anything about employees, skills, projects, or organizational
 # Initialize chat history
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "query_cache" not in st.session_state:
+    st.session_state.query_cache = {}
+if "summary_keys" not in st.session_state:
+    st.session_state.summary_keys = set()
 
 # Display chat messages
 for message in st.session_state.messages:
     with st.chat_message(message["role"]):
-        if "data" in message and message["data"] is not None:
-            st.dataframe(pd.DataFrame(message["data"]), width='stretch')
+        if message.get("df") is not None:
+            st.dataframe(message["df"], width='stretch')
         st.markdown(message["content"])
 
 # Chat input
@@ -232,40 +389,49 @@ if prompt := st.chat_input("Ask about employees, skills, projects..."):
             prompt_lower = prompt.lower()
             data = None
             query_type = "general"
+            response_text = None  # filled in below, after the table is shown
+            intents = detect_intents(prompt_lower)
             
             # Employee-specific search
-            if any(word in prompt_lower for word in ['malavika', 'omkar', 'john', 'alice', 'about', 'tell me about', 'details of']):
-                name_match = re.search(r'(?:about|tell me about|show|find|details of)\s+([a-zA-Z\s]+)', prompt_lower)
+            if "employee" in intents:
+                name_match = _NAME_RE.search(prompt_lower)
                 employee_name = name_match.group(1).strip() if name_match else prompt
                 
-                employee_data = get_comprehensive_employee_data(employee_name)
+                employee_data = cached_query("employee_search", prompt,
+                                             lambda: get_comprehensive_employee_data(employee_name))
                 
                 if employee_data:
                     data = [employee_data]
                     query_type = "employee_search"
-                    response_text = generate_ai_summary(prompt, data, query_type)
                 else:
                     response_text = f"❌ No employee found with name containing '{employee_name}' in the database."
                     data = None
                     
             # Skills search
-            elif any(word in prompt_lower for word in ['python', 'java', 'skill', 'react', 'knows', 'knowledge']):
-                skill_match = re.search(r'(?:knows?|with|has|skill[s]?)\s+([a-zA-Z\s]+)', prompt_lower)
+            elif "skill" in intents:
+                skill_match = _SKILL_RE.search(prompt_lower)
                 skill = skill_match.group(1).strip() if skill_match else "python"
                 
-                cypher = """
+                fulltext_cypher = """
+                CALL db.index.fulltext.queryNodes('skill_ft', $skill) YIELD node AS s
+                MATCH (e:Employee)-[:HAS_SKILL]->(s)
+                RETURN e.name AS employee, e.designation AS designation, 
+                       e.empId AS employee_id, s.name AS skill, e.doj AS date_of_joining
+                ORDER BY e.name
+                """
+                contains_cypher = """
                 MATCH (e:Employee)-[:HAS_SKILL]->(s:Skill)
                 WHERE toLower(s.name) CONTAINS toLower($skill)
                 RETURN e.name AS employee, e.designation AS designation, 
                        e.empId AS employee_id, s.name AS skill, e.doj AS date_of_joining
                 ORDER BY e.name
                 """
-                data = run_cypher(cypher, {"skill": skill})
+                data = cached_query("skills", prompt,
+                                    lambda: run_fulltext(fulltext_cypher, contains_cypher, "skill", skill))
                 query_type = "skills"
-                response_text = generate_ai_summary(prompt, data, query_type)
                 
             # Projects search
-            elif any(word in prompt_lower for word in ['project', 'working on', 'team']):
+            elif "project" in intents:
                 cypher = """
                 MATCH (e:Employee)-[:WORKS_ON]->(p:Project)
                 RETURN e.name AS employee, e.designation AS designation,
@@ -273,12 +439,11 @@ if prompt := st.chat_input("Ask about employees, skills, projects..."):
                 ORDER BY p.name, e.name
                 LIMIT 50
                 """
-                data = run_cypher(cypher)
+                data = cached_query("projects", prompt, lambda: run_cypher(cypher))
                 query_type = "projects"
-                response_text = generate_ai_summary(prompt, data, query_type)
                 
             # All employees
-            elif any(word in prompt_lower for word in ['all', 'list', 'show', 'employees']):
+            elif "list" in intents:
                 cypher = """
                 MATCH (e:Employee)
                 RETURN e.name AS employee, e.designation AS designation,
@@ -286,13 +451,18 @@ if prompt := st.chat_input("Ask about employees, skills, projects..."):
                 ORDER BY e.name
                 LIMIT 100
                 """
-                data = run_cypher(cypher)
+                data = cached_query("employees", prompt, lambda: run_cypher(cypher))
                 query_type = "employees"
-                response_text = generate_ai_summary(prompt, data, query_type)
                 
             else:
                 # General search
-                cypher = """
+                fulltext_cypher = """
+                CALL db.index.fulltext.queryNodes('emp_ft', $search) YIELD node AS e
+                RETURN e.name AS employee, e.designation AS designation,
+                       e.empId AS employee_id, e.doj AS date_of_joining
+                LIMIT 50
+                """
+                contains_cypher = """
                 MATCH (e:Employee)
                 WHERE toLower(e.name) CONTAINS toLower($search) OR 
                       toLower(e.designation) CONTAINS toLower($search)
@@ -300,33 +470,40 @@ if prompt := st.chat_input("Ask about employees, skills, projects..."):
                        e.empId AS employee_id, e.doj AS date_of_joining
                 LIMIT 50
                 """
-                data = run_cypher(cypher, {"search": prompt})
+                data = cached_query("general", prompt,
+                                    lambda: run_fulltext(fulltext_cypher, contains_cypher, "search", prompt))
                 query_type = "general"
-                response_text = generate_ai_summary(prompt, data, query_type)
             
-            # Display results
-            if data and len(data) > 0:
-                # Clean data for display
-                display_data = []
-                for item in data:
-                    clean_item = {}
-                    for key, value in item.items():
-                        if isinstance(value, list):
-                            clean_item[key] = ", ".join(value) if value else "None"
-                        else:
-                            clean_item[key] = value if value is not None else "Not specified"
-                    display_data.append(clean_item)
-                
-                st.dataframe(pd.DataFrame(display_data), width='stretch')
+        # Display results
+        df = None
+        if data and len(data) > 0:
+            # Clean data for display
+            display_data = []
+            for item in data:
+                clean_item = {}
+                for key, value in item.items():
+                    if isinstance(value, list):
+                        clean_item[key] = ", ".join(value) if value else "None"
+                    else:
+                        clean_item[key] = value if value is not None else NOT_SPECIFIED
+                display_data.append(clean_item)
             
+            df = pd.DataFrame(display_data)
+            st.dataframe(df, width='stretch')
+        
+        if response_text is None:
+            placeholder = st.empty()
+            response_text = generate_ai_summary(prompt, data, query_type, placeholder=placeholder, df=df)
+            placeholder.markdown(response_text)
+        else:
             st.markdown(response_text)
-            
-            # Add to chat history
-            st.session_state.messages.append({
-                "role": "assistant", 
-                "content": response_text,
-                "data": data
-            })
+        
+        # Add to chat history
+        st.session_state.messages.append({
+            "role": "assistant", 
+            "content": response_text,
+            "df": df
+        })
 
 # Sidebar with database info
 with st.sidebar:
@@ -334,13 +511,18 @@ with st.sidebar:
     
     if st.button("Check Database Connection"):
         try:
-            test_query = "MATCH (e:Employee) RETURN count(e) AS total_employees"
-            result = run_cypher(test_query)
-            st.success(f"✅ Connected! Total employees: {result[0]['total_employees']}")
+            stats_query = """
+            CALL { MATCH (e:Employee) RETURN count(e) AS employees }
+            CALL { MATCH (s:Skill) RETURN count(s) AS skills }
+            CALL { MATCH (p:Project) RETURN count(p) AS projects }
+            RETURN employees, skills, projects
+            """
+            stats = run_cypher(stats_query)[0]
+            st.success(f"✅ Connected! Total employees: {stats['employees']}")
             
             # Show some stats
-            skills_count = run_cypher("MATCH (s:Skill) RETURN count(s) AS skills")[0]['skills']
-            projects_count = run_cypher("MATCH (p:Project) RETURN count(p) AS projects")[0]['projects']
+            skills_count = stats['skills']
+            projects_count = stats['projects']
             st.info(f"Skills: {skills_count} | Projects: {projects_count}")
             
         except Exception as e:
@@ -370,4 +552,9 @@ with st.sidebar:
     
     if st.button("Clear Chat"):
         st.session_state.messages = []
-        st.rerun()
\ No newline at end of file
+        st.rerun()
+    
+    if st.button("Clear Cache"):
+        st.session_state.query_cache = {}
+        _summary_clear_session()
+        st.success("✅ Cleared your cached query results and summaries.")
\ No newline at end of file
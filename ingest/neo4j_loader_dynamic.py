@@ -10,97 +10,97 @@
 # - Attaches any unknown Excel columns as Employee properties (snake_case) WITHOUT APOC
 
 import argparse
+import numpy as np
 import pandas as pd
 from neo4j import GraphDatabase
-from datetime import date
 import re
 import sys
-from typing import Dict, Any, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Tuple
 
 # --------------------------
 # Helpers
 # --------------------------
 
+_WS_RE = re.compile(r"\s+")
+_NON_ALNUM_RE = re.compile(r"[^0-9A-Za-z]+")
+
 def norm_col(c: str) -> str:
     """Normalize column header whitespace."""
-    return re.sub(r"\s+", " ", c.strip())
+    return _WS_RE.sub(" ", c.strip())
 
-def norm_str(x):
-    """Return trimmed string or None."""
-    if x is None:
-        return None
-    try:
-        if pd.isna(x):
-            return None
-    except Exception:
-        pass
-    s = str(x).strip()
-    return s if s else None
+def clean_text(col: pd.Series) -> pd.Series:
+    """
+    Column of trimmed strings, blanks as missing, rendered the way read_excel(dtype=str)
+    would: whole floats without '.0', datetimes as 'YYYY-MM-DD HH:MM:SS'.
+    """
+    if pd.api.types.is_datetime64_any_dtype(col):
+        text = col.dt.strftime("%Y-%m-%d %H:%M:%S").astype("string")
+    elif pd.api.types.is_float_dtype(col):
+        text = col.astype("string")
+        whole = (col.notna() & (col % 1 == 0)).to_numpy()
+        text[whole] = col[whole].astype("int64").astype("string")
+    else:
+        text = col.astype("string")
+    return text.str.strip().replace({"": pd.NA})
 
 def snake(s: str) -> str:
     """snake_case a header into a property key."""
     s = s.strip().replace("(", "").replace(")", "")
-    s = re.sub(r"[^0-9A-Za-z]+", "_", s).strip("_")
+    s = _NON_ALNUM_RE.sub("_", s).strip("_")
     return s.lower()
 
-def parse_date_flex(x):
+def parse_dates(col: pd.Series) -> pd.Series:
     """
-    Parse many date shapes (DDMMYY, DD/MM/YY, DD-MM-YYYY, YYYY-MM-DD, Excel datetime).
-    Returns ISO 'YYYY-MM-DD' or None.
+    Parse a column of mixed date shapes (DDMMYY, DD/MM/YY, DD-MM-YYYY, YYYY-MM-DD, Excel datetime).
+    Returns ISO 'YYYY-MM-DD' strings, missing where a cell cannot be parsed.
     """
-    if x is None:
-        return None
-    try:
-        if pd.isna(x):
-            return None
-    except Exception:
-        pass
-
-    s = str(x).strip()
-    if not s:
-        return None
-
-    # Try pandas flexible parser (suppress the warning)
-    for dayfirst in (True, False):
-        try:
-            dt = pd.to_datetime(s, dayfirst=dayfirst, errors="coerce")
-            if pd.notna(dt):
-                return dt.date().isoformat()
-        except Exception:
-            pass
-
-    # Try DDMMYY without separators
-    s2 = s.replace("/", "").replace("-", "").replace(".", "").replace(" ", "")
-    if len(s2) == 6 and s2.isdigit():
-        dd, mm, yy = int(s2[:2]), int(s2[2:4]), int(s2[4:])
+    # Go through the text form, so Excel date cells read exactly as the sheet's other dates
+    text = clean_text(col).astype(object)
+
+    # Pandas flexible parser over the whole column
+    dt = pd.to_datetime(text, dayfirst=True, errors="coerce", format="mixed")
+
+    # DDMMYY without separators for whatever is left
+    compact = text.str.replace(r"[/\-. ]", "", regex=True)
+    mask = dt.isna() & compact.str.fullmatch(r"\d{6}", na=False)
+    if mask.any():
+        parts = compact[mask].str.extract(r"(\d{2})(\d{2})(\d{2})").astype(int)
+        dd, mm, yy = parts[0], parts[1], parts[2]
         # standard 2-digit year window
-        year = 2000 + yy if yy <= 69 else 1900 + yy
-        try:
-            return date(year, mm, dd).isoformat()
-        except Exception:
-            return None
+        year = np.where(yy <= 69, 2000 + yy, 1900 + yy)
+        dt[mask] = pd.to_datetime(
+            pd.DataFrame({"year": year, "month": mm, "day": dd}, index=parts.index),
+            errors="coerce",
+        )
 
-    return None
+    return dt.dt.strftime("%Y-%m-%d")
 
 # --------------------------
 # Record builder
 # --------------------------
 
+# Canonical fields of every record produced by build_records (plus "extra")
+RECORD_FIELDS = [
+    "empId", "name", "gender", "doj", "designation", "managerName",
+    "leadName", "primarySkill", "secondarySkill", "project", "team",
+]
+
 def build_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
     """
     Normalize Excel data and map known columns to canonical fields.
-    Unknown columns go into 'extra' and will be attached to Employee via SET e += r.extra
+    Unknown columns go into 'extra' and are attached to Employee properties by upsert()
     """
     col_map_variants = {
-        "emp_id": ["Emp Id", "Emp Id ", "Employee Id", "EmpID"],
+        "empId": ["Emp Id", "Emp Id ", "Employee Id", "EmpID"],
         "name": ["Emp Name", "Employee Name", "Name"],
         "gender": ["Gender"],
         "doj": ["Date of Joining (DDMMYY)", "Date of Joining", "DOJ"],
         "designation": ["Designation", "Title", "Role"],
-        "manager_name": ["Reporting Manager", "Manager", "Reports To"],
-        "lead_name": ["Lead Reporting", "Lead", "Project Lead"],
-        "primary_skill": ["Primary Skill", "Primary skill"],
-        "secondary_skill": ["Secondary Skill", "Secondary skill"],
+        "managerName": ["Reporting Manager", "Manager", "Reports To"],
+        "leadName": ["Lead Reporting", "Lead", "Project Lead"],
+        "primarySkill": ["Primary Skill", "Primary skill"],
+        "secondarySkill": ["Secondary Skill", "Secondary skill"],
         "project": ["Current Project", "Project"],
         # Optional (if/when you add it)
         "team": ["Team", "Department"]
@@ -115,66 +115,40 @@ def build_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
         for v in variants:
             inv[norm_col(v)] = key
 
-    records: List[Dict[str, Any]] = []
-
     # Columns not recognized become passthrough properties
-    passthrough_cols = set(df.columns) - set(inv.keys())
     ignore_cols = {"Sr No", "S.No", "Sr. No", "Serial", "Serial No"}
-    passthrough_cols = {c for c in passthrough_cols if norm_col(c) not in ignore_cols}
-
-    for _, row in df.iterrows():
-        rec: Dict[str, Any] = {
-            "empId": None,
-            "name": None,
-            "gender": None,
-            "doj": None,
-            "designation": None,
-            "managerName": None,
-            "leadName": None,
-            "primarySkill": None,
-            "secondarySkill": None,
-            "project": None,
-            "team": None,
-            "extra": {}
-        }
-
-        for c, v in row.items():
-            key = inv.get(norm_col(c))
-            if key is None:
-                val = norm_str(v)
-                if val is not None:
-                    rec["extra"][snake(c)] = val
-            else:
-                if key == "emp_id":
-                    rec["empId"] = norm_str(v)
-                elif key == "name":
-                    rec["name"] = norm_str(v)
-                elif key == "gender":
-                    rec["gender"] = norm_str(v)
-                elif key == "doj":
-                    rec["doj"] = parse_date_flex(v)
-                elif key == "designation":
-                    rec["designation"] = norm_str(v)
-                elif key == "manager_name":
-                    rec["managerName"] = norm_str(v)
-                elif key == "lead_name":
-                    rec["leadName"] = norm_str(v)
-                elif key == "primary_skill":
-                    vs = norm_str(v)
-                    rec["primarySkill"] = vs.lower() if vs else None
-                elif key == "secondary_skill":
-                    vs = norm_str(v)
-                    rec["secondarySkill"] = vs.lower() if vs else None
-                elif key == "project":
-                    rec["project"] = norm_str(v)
-                elif key == "team":
-                    rec["team"] = norm_str(v)
-
-        # Only keep rows with both Emp Id + Emp Name
-        if rec["empId"] and rec["name"]:
-            records.append(rec)
-
-    return records
+    known_cols = [c for c in df.columns if c in inv]
+    pass_cols = [c for c in df.columns if c not in inv and c not in ignore_cols]
+
+    # Known columns -> canonical fields (last header wins if two map to the same field)
+    known = df[known_cols].rename(columns=inv)
+    known = known.loc[:, ~known.columns.duplicated(keep="last")]
+    known = known.reindex(columns=RECORD_FIELDS)
+
+    for col in RECORD_FIELDS:
+        if col != "doj":
+            known[col] = clean_text(known[col])
+    known["primarySkill"] = known["primarySkill"].str.lower()
+    known["secondarySkill"] = known["secondarySkill"].str.lower()
+
+    known["doj"] = parse_dates(known["doj"])
+
+    known = known.astype(object).where(known.notna(), None)
+
+    # Only keep rows with both Emp Id + Emp Name
+    keep = (known["empId"].notna() & known["name"].notna()).to_numpy()
+    known = known[keep]
+
+    # Passthrough cells -> per-row 'extra' maps, skipping empty cells
+    extra_df = df.loc[keep, pass_cols].apply(clean_text)
+    extra_df = extra_df.astype(object).where(extra_df.notna(), None)
+    extra_df.columns = [snake(c) for c in pass_cols]
+    extras = [
+        {k: v for k, v in row.items() if v is not None}
+        for row in extra_df.to_dict("records")
+    ] if pass_cols else [{} for _ in range(len(known))]
+
+    return known.assign(extra=extras).to_dict("records")
 
 # --------------------------
 # Cypher setup (run individually)
@@ -186,17 +160,137 @@ SETUP_STATEMENTS = [
     "CREATE CONSTRAINT project_name IF NOT EXISTS FOR (p:Project) REQUIRE p.name IS UNIQUE",
     "CREATE INDEX emp_name IF NOT EXISTS FOR (e:Employee) ON (e.name)",
     "CREATE INDEX team_name IF NOT EXISTS FOR (t:Team) ON (t.name)",
+    # Full-text indexes backing the chatbot's free-text searches
+    "CREATE FULLTEXT INDEX emp_ft IF NOT EXISTS FOR (e:Employee) ON EACH [e.name, e.designation]",
+    "CREATE FULLTEXT INDEX skill_ft IF NOT EXISTS FOR (s:Skill) ON EACH [s.name]",
+]
+
+# --------------------------
+# Upsert statements
+# --------------------------
+
+# Employees (passthrough properties are appended by employee_statement)
+EMPLOYEE_UPSERT = """
+UNWIND $rows AS r
+MERGE (e:Employee {empId:r.empId})
+  ON CREATE SET e.name = r.name
+  ON MATCH  SET e.name = coalesce(r.name, e.name)
+SET e.gender = r.gender,
+    e.designation = r.designation,
+    e.doj = CASE WHEN r.doj IS NULL THEN e.doj ELSE date(r.doj) END
+"""
+
+# Optional Team link
+TEAM_UPSERT = """
+UNWIND $rows AS r
+MATCH (e:Employee {empId:r.empId})
+MERGE (t:Team {name:r.team})
+MERGE (e)-[:WORKS_IN]->(t)
+"""
+
+# Manager edges (create stub if needed)
+MANAGER_UPSERT = """
+UNWIND $rows AS r
+MATCH (e:Employee {empId:r.empId})
+MERGE (mgr:Employee {name:r.managerName})
+  ON CREATE SET mgr.empId = "stub::manager::" + r.empId + "::" + r.managerName
+MERGE (e)-[:REPORTS_TO]->(mgr)
+"""
+
+# Lead edges (create stub if needed)
+LEAD_UPSERT = """
+UNWIND $rows AS r
+MATCH (e:Employee {empId:r.empId})
+MERGE (lead:Employee {name:r.leadName})
+  ON CREATE SET lead.empId = "stub::lead::" + r.empId + "::" + r.leadName
+MERGE (e)-[:LEAD_REPORTING]->(lead)
+"""
+
+# Skills
+SKILLS_UPSERT = """
+UNWIND $rows AS r
+MATCH (e:Employee {empId:r.empId})
+FOREACH (_ IN CASE WHEN r.primarySkill IS NULL THEN [] ELSE [1] END |
+  MERGE (s1:Skill {name:r.primarySkill})
+  MERGE (e)-[:HAS_SKILL {type:"primary"}]->(s1)
+)
+FOREACH (_ IN CASE WHEN r.secondarySkill IS NULL THEN [] ELSE [1] END |
+  MERGE (s2:Skill {name:r.secondarySkill})
+  MERGE (e)-[:HAS_SKILL {type:"secondary"}]->(s2)
+)
+"""
+
+# Projects
+PROJECT_UPSERT = """
+UNWIND $rows AS r
+MATCH (e:Employee {empId:r.empId})
+MERGE (p:Project {name:r.project})
+MERGE (e)-[w:WORKS_ON]->(p)
+SET w.since = coalesce(w.since, CASE WHEN r.doj IS NULL THEN NULL ELSE date(r.doj) END)
+"""
+
+# Relationship groups that run concurrently. Every group creates relationships on the same
+# Employee nodes, so they contend for node locks and can deadlock each other; this is only
+# safe because run_batched uses execute_write, which retries the transient deadlock errors.
+# Do not swap in a non-retrying session.run here.
+# Manager and lead edges both MERGE Employee stubs by name and stay in one ordered group.
+# Each statement is paired with the record fields a row needs (any of them) to be sent;
+# the statements above rely on this prefilter instead of a WHERE guard.
+RELATIONSHIP_GROUPS = [
+    [(TEAM_UPSERT, ("team",))],
+    [(MANAGER_UPSERT, ("managerName",)), (LEAD_UPSERT, ("leadName",))],
+    [(SKILLS_UPSERT, ("primarySkill", "secondarySkill"))],
+    [(PROJECT_UPSERT, ("project",))],
 ]
 
 # --------------------------
 # Upsert logic
 # --------------------------
 
-def upsert(driver, records: List[Dict[str, Any]], database: str = "neo4j"):
+BATCH_SIZE = 1000
+MAX_WORKERS = 4
+
+def chunks(xs: List[Any], n: int):
+    """Yield successive n-sized slices of xs."""
+    for i in range(0, len(xs), n):
+        yield xs[i:i + n]
+
+def run_batched(session, cypher: str, records: List[Dict[str, Any]], batch_size: int = BATCH_SIZE):
+    """Run an UNWIND $rows statement once per batch, each in its own write transaction."""
+    for batch in chunks(records, batch_size):
+        session.execute_write(lambda tx: tx.run(cypher, rows=batch).consume())
+
+def run_group(driver, database: str, statements: List[Tuple[str, List[Dict[str, Any]]]],
+              batch_size: int = BATCH_SIZE):
+    """Run (cypher, rows) pairs in order in a session of their own (sessions are not thread-safe)."""
+    with driver.session(database=database) as s:
+        for cypher, rows in statements:
+            run_batched(s, cypher, rows, batch_size)
+
+def employee_statement(extra_keys: List[str]) -> str:
+    """
+    EMPLOYEE_UPSERT plus one SET per passthrough property, read from r.x0, r.x1, ...
+    Missing values keep whatever the node already has.
+    """
+    if not extra_keys:
+        return EMPLOYEE_UPSERT
+    sets = ",\n    ".join(f"e.`{k}` = coalesce(r.x{i}, e.`{k}`)" for i, k in enumerate(extra_keys))
+    return EMPLOYEE_UPSERT + f"SET {sets}\n"
+
+def upsert(driver, records: List[Dict[str, Any]], database: str = "neo4j", batch_size: int = BATCH_SIZE):
     if not records:
         print("⚠️  No valid rows (need Emp Id and Emp Name). Nothing to import.")
         return
 
+    # Flatten the per-row 'extra' maps into one fixed column set (x0, x1, ...) shared by
+    # every row. Positional names keep passthrough keys from clashing with core fields.
+    extra_keys = sorted(set().union(*(r["extra"].keys() for r in records)))
+    core_rows = [{k: v for k, v in r.items() if k != "extra"} for r in records]
+    employee_rows = [
+        {**row, **{f"x{i}": v for i, k in enumerate(extra_keys) if (v := r["extra"].get(k)) is not None}}
+        for row, r in zip(core_rows, records)
+    ]
+
     with driver.session(database=database) as s:
         # Run setup one-by-one (driver requires single statement per run)
         for stmt in SETUP_STATEMENTS:
@@ -206,72 +300,20 @@ def upsert(driver, records: List[Dict[str, Any]], database: str = "neo4j"):
                 # Non-fatal if already exists or lacks privilege; continue
                 print(f"ℹ️  Setup statement notice: {stmt} -> {e}")
 
-        # Employees + dynamic extra properties (APOC-free)
-        s.run("""
-        UNWIND $rows AS r
-        MERGE (e:Employee {empId:r.empId})
-          ON CREATE SET e.name = r.name
-          ON MATCH  SET e.name = coalesce(r.name, e.name)
-        SET e.gender = r.gender,
-            e.designation = r.designation,
-            e.doj = CASE WHEN r.doj IS NULL THEN e.doj ELSE date(r.doj) END,
-            e += r.extra
-        """, rows=records)
-
-        # Optional Team link
-        s.run("""
-        UNWIND $rows AS r
-        WITH r WHERE r.team IS NOT NULL AND r.team <> ""
-        MATCH (e:Employee {empId:r.empId})
-        MERGE (t:Team {name:r.team})
-        MERGE (e)-[:WORKS_IN]->(t)
-        """, rows=records)
-
-        # Manager edges - FIXED VERSION
-        s.run("""
-        UNWIND $rows AS r
-        WITH r WHERE r.managerName IS NOT NULL AND r.managerName <> ""
-        MATCH (e:Employee {empId:r.empId})
-        // Ensure manager exists (create stub if needed)
-        MERGE (mgr:Employee {name:r.managerName})
-          ON CREATE SET mgr.empId = "stub::manager::" + r.empId + "::" + r.managerName
-        MERGE (e)-[:REPORTS_TO]->(mgr)
-        """, rows=records)
-
-        # Lead edges - FIXED VERSION
-        s.run("""
-        UNWIND $rows AS r
-        WITH r WHERE r.leadName IS NOT NULL AND r.leadName <> ""
-        MATCH (e:Employee {empId:r.empId})
-        // Ensure lead exists (create stub if needed)
-        MERGE (lead:Employee {name:r.leadName})
-          ON CREATE SET lead.empId = "stub::lead::" + r.empId + "::" + r.leadName
-        MERGE (e)-[:LEAD_REPORTING]->(lead)
-        """, rows=records)
-
-        # Skills
-        s.run("""
-        UNWIND $rows AS r
-        MATCH (e:Employee {empId:r.empId})
-        FOREACH (_ IN CASE WHEN r.primarySkill IS NULL THEN [] ELSE [1] END |
-          MERGE (s1:Skill {name:r.primarySkill})
-          MERGE (e)-[:HAS_SKILL {type:"primary"}]->(s1)
-        )
-        FOREACH (_ IN CASE WHEN r.secondarySkill IS NULL THEN [] ELSE [1] END |
-          MERGE (s2:Skill {name:r.secondarySkill})
-          MERGE (e)-[:HAS_SKILL {type:"secondary"}]->(s2)
-        )
-        """, rows=records)
-
-        # Projects
-        s.run("""
-        UNWIND $rows AS r
-        WITH r WHERE r.project IS NOT NULL AND r.project <> ""
-        MATCH (e:Employee {empId:r.empId})
-        MERGE (p:Project {name:r.project})
-        MERGE (e)-[w:WORKS_ON]->(p)
-        SET w.since = coalesce(w.since, CASE WHEN r.doj IS NULL THEN NULL ELSE date(r.doj) END)
-        """, rows=records)
+        # Every Employee must exist first so manager/lead names resolve to real nodes
+        run_batched(s, employee_statement(extra_keys), employee_rows, batch_size)
+
+    # Send each statement only the rows that carry its fields
+    groups = [
+        [(cypher, [r for r in core_rows if any(r[f] for f in fields)]) for cypher, fields in group]
+        for group in RELATIONSHIP_GROUPS
+    ]
+
+    # Relationship groups in parallel, one session each
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        futs = [ex.submit(run_group, driver, database, group, batch_size) for group in groups]
+        for f in futs:
+            f.result()
 
 # --------------------------
 # Main
@@ -285,11 +327,12 @@ def main():
     ap.add_argument("--user", required=True, help="Neo4j username (e.g., neo4j)")
     ap.add_argument("--password", required=True, help="Neo4j password")
     ap.add_argument("--database", default="neo4j", help="Neo4j database (Aura default = neo4j)")
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Rows per write transaction")
     args = ap.parse_args()
 
     # Load Excel
     try:
-        df = pd.read_excel(args.excel, sheet_name=args.sheet, dtype=str)
+        df = pd.read_excel(args.excel, sheet_name=args.sheet)
     except ValueError as e:
         print(f"❌ Could not open sheet '{args.sheet}'. Error: {e}")
         print("   Tip: check the sheet name in Excel and pass it via --sheet \"Exact Name\"")
@@ -307,7 +350,7 @@ def main():
     # Connect + upsert
     driver = GraphDatabase.driver(args.uri, auth=(args.user, args.password))
     try:
-        upsert(driver, records, database=args.database)
+        upsert(driver, records, database=args.database, batch_size=args.batch_size)
     finally:
         driver.close()
 